@@ -7,26 +7,36 @@ import cv2
 import face_recognition
 import shutil
 import threading
+import time
 import json
+import queue
 import mysql.connector
 from werkzeug.security import generate_password_hash, check_password_hash
 import qrcode
 from io import BytesIO
+from urllib.parse import quote
 import uuid
 from datetime import datetime
 
 # NEW: Import the model
 from face_model import FaceRecognitionModel
+from face_tracker import FaceTracker
+from image_hash import BurstIndex
+from retention import RetentionManager, RETENTION_ACTIONS, DEFAULT_RETENTION_DAYS
+from chunked_upload import ChunkedUploadManager
 
 # --- CONFIGURATION ---
 app = Flask(__name__, static_folder='../frontend/static', template_folder='../frontend/pages')
 app.secret_key = 'your_super_secret_key_here'
 DB_CONFIG = {'host': 'localhost', 'user': 'root', 'password': '', 'database': 'picme_db'}
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, '..', 'uploads')
-PROCESSED_FOLDER = os.path.join(BASE_DIR, '..', 'processed')
-EVENTS_DATA_PATH = os.path.join(BASE_DIR, '..', 'events_data.json')
-KNOWN_FACES_DATA_PATH = os.path.join(BASE_DIR, 'known_faces.dat')
+# Storage paths can be overridden with PICME_* environment variables (e.g. to run the benchmarks in a temp dir)
+UPLOAD_FOLDER = os.environ.get('PICME_UPLOAD_FOLDER', os.path.join(BASE_DIR, '..', 'uploads'))
+PROCESSED_FOLDER = os.environ.get('PICME_PROCESSED_FOLDER', os.path.join(BASE_DIR, '..', 'processed'))
+ARCHIVE_FOLDER = os.environ.get('PICME_ARCHIVE_FOLDER', os.path.join(BASE_DIR, '..', 'archive'))
+EVENTS_DATA_PATH = os.environ.get('PICME_EVENTS_DATA_PATH', os.path.join(BASE_DIR, '..', 'events_data.json'))
+KNOWN_FACES_DATA_PATH = os.environ.get('PICME_KNOWN_FACES_DATA_PATH', os.path.join(BASE_DIR, 'known_faces.dat'))
+RETENTION_STATE_PATH = os.environ.get('PICME_RETENTION_STATE_PATH', os.path.join(BASE_DIR, 'retention_state.json'))
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
@@ -37,6 +47,77 @@ os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 # --- INITIALIZE THE ML MODEL ---
 model = FaceRecognitionModel(data_file=KNOWN_FACES_DATA_PATH)
 
+# --- EVENTS DATA ---
+# Every write to events_data.json goes through update_events_data so concurrent writers can't lose updates
+events_data_lock = threading.Lock()
+
+def update_events_data(mutate):
+    """Loads events_data.json, applies mutate(events_data) in place and writes it back, all under events_data_lock."""
+    with events_data_lock:
+        if os.path.exists(EVENTS_DATA_PATH):
+            with open(EVENTS_DATA_PATH, 'r') as f:
+                events_data = json.load(f)
+        else:
+            events_data = []
+        result = mutate(events_data)
+        with open(EVENTS_DATA_PATH, 'w') as f:
+            json.dump(events_data, f, indent=2)
+        return result
+
+# --- LIVE RECOGNITION STREAMS ---
+# One FaceTracker per open camera stream, dropped after STREAM_IDLE_TIMEOUT seconds without frames
+recognition_streams = {}
+recognition_streams_lock = threading.Lock()
+STREAM_IDLE_TIMEOUT = 60
+
+# --- NEAR-DUPLICATE (BURST) DETECTION ---
+# One BurstIndex per event so re-processing and burst shots skip detection + encoding
+burst_indexes = {}
+burst_indexes_lock = threading.Lock()
+BURSTS_FILENAME = 'bursts.json'
+BURST_INDEX_FILENAME = 'burst_index.dat'  # Hashes + face data of processed photos, see BurstIndex.save
+BURST_INDEX_IDLE_TIMEOUT = 30 * 60  # Seconds before an unused event's index is dropped from memory
+
+# --- RETENTION ---
+retention = RetentionManager(model, UPLOAD_FOLDER, PROCESSED_FOLDER, ARCHIVE_FOLDER, EVENTS_DATA_PATH, RETENTION_STATE_PATH,
+                             update_events_data=update_events_data,
+                             on_event_expired=lambda event_id: burst_indexes.pop(event_id, None))
+RETENTION_TICK_SECONDS = 60
+RETENTION_ENABLED = os.environ.get('PICME_RETENTION_ENABLED', '1') != '0'
+retention_thread_lock = threading.Lock()
+retention_thread = None
+
+def ensure_retention_thread():
+    """Starts the retention loop on the first request, like ensure_processing_worker, so it runs under any server."""
+    global retention_thread
+    if not RETENTION_ENABLED: return
+    with retention_thread_lock:
+        if retention_thread is None or not retention_thread.is_alive():
+            retention_thread = threading.Thread(target=retention.run_forever, args=(RETENTION_TICK_SECONDS,), daemon=True)
+            retention_thread.start()
+
+# --- CHUNKED UPLOADS ---
+# Finished uploads go onto processing_queue and are processed one file at a time
+processing_queue = queue.Queue()
+processing_worker_lock = threading.Lock()
+processing_worker_thread = None
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+
+def ensure_processing_worker():
+    """Starts the worker on first use, so it also runs under flask run or a WSGI server."""
+    global processing_worker_thread
+    with processing_worker_lock:
+        if processing_worker_thread is None or not processing_worker_thread.is_alive():
+            processing_worker_thread = threading.Thread(target=processing_worker, daemon=True)
+            processing_worker_thread.start()
+
+def enqueue_uploaded_photo(event_id, filename):
+    ensure_processing_worker()
+    processing_queue.put((event_id, filename))
+    increment_photos_count(event_id, 1)
+
+chunked_uploads = ChunkedUploadManager(UPLOAD_FOLDER, on_complete=enqueue_uploaded_photo)
+
 # --- HELPER FUNCTIONS ---
 def get_db_connection():
     try: return mysql.connector.connect(**DB_CONFIG)
@@ -49,45 +130,155 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def decode_base64_image(image_data):
+    img_bytes = base64.b64decode(image_data)
+    np_arr = np.frombuffer(img_bytes, np.uint8)
+    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def get_person_photos(event_id, person_id):
+    """Returns (individual_photos, group_photos) for a person, or None if they have no photos in the event."""
+    person_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id, person_id)
+    if not os.path.exists(person_dir): return None
+
+    individual_dir = os.path.join(person_dir, "individual")
+    group_dir = os.path.join(person_dir, "group")
+    individual_photos = [f for f in os.listdir(individual_dir)] if os.path.exists(individual_dir) else []
+    group_photos = [f for f in os.listdir(group_dir) if f.startswith('watermarked_')] if os.path.exists(group_dir) else []
+    return individual_photos, group_photos
+
+def expire_idle_streams():
+    now = datetime.now().timestamp()
+    with recognition_streams_lock:
+        for stream_id in [sid for sid, t in recognition_streams.items() if now - t.last_seen > STREAM_IDLE_TIMEOUT]:
+            del recognition_streams[stream_id]
+
+def save_burst_index(event_id, burst_index):
+    output_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
+    if not os.path.isdir(output_dir): return
+    burst_index.save(os.path.join(output_dir, BURST_INDEX_FILENAME))
+    with open(os.path.join(output_dir, BURSTS_FILENAME), 'w') as f:
+        json.dump(burst_index.groups, f, indent=2)
+
+def get_burst_index(event_id):
+    """Returns the event's BurstIndex, reloading it from disk if it was evicted or the app restarted."""
+    now = time.time()
+    with burst_indexes_lock:
+        for idle_event_id in [eid for eid, index in burst_indexes.items() if now - index.last_used > BURST_INDEX_IDLE_TIMEOUT]:
+            # Saved on the way out so groups found since the last finish_event_processing are kept
+            save_burst_index(idle_event_id, burst_indexes.pop(idle_event_id))
+        if event_id not in burst_indexes:
+            index_path = os.path.join(app.config['PROCESSED_FOLDER'], event_id, BURST_INDEX_FILENAME)
+            if os.path.exists(index_path):
+                burst_indexes[event_id] = BurstIndex.load(index_path)
+            else:
+                burst_indexes[event_id] = BurstIndex()
+                burst_indexes[event_id].groups = load_burst_groups(event_id)
+        return burst_indexes[event_id]
+
+def load_burst_groups(event_id):
+    bursts_path = os.path.join(app.config['PROCESSED_FOLDER'], event_id, BURSTS_FILENAME)
+    if not os.path.exists(bursts_path): return {}
+    with open(bursts_path, 'r') as f:
+        return json.load(f)
+
+def process_image(event_id, filename):
+    """Detects, learns and files the faces of one uploaded photo."""
+    image_path = os.path.join(app.config['UPLOAD_FOLDER'], event_id, filename)
+    output_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
+    burst_index = get_burst_index(event_id)
+    print(f"--- [PROCESS] Image: {filename}")
+    try:
+        image_hash = burst_index.hash_file(image_path)
+        duplicate_of = burst_index.find(image_hash)
+        if duplicate_of:
+            # Near-duplicate of an already processed frame: reuse its faces
+            burst_index.record_duplicate(filename, duplicate_of)
+            face_encodings = duplicate_of["face_encodings"]
+            print(f"--- [PROCESS] {filename} is a near-duplicate of {duplicate_of['filename']}, reusing {len(face_encodings)} face(s)")
+        else:
+            started = time.perf_counter()
+            image = face_recognition.load_image_file(image_path)
+            face_locations = face_recognition.face_locations(image)
+            face_encodings = face_recognition.face_encodings(image, face_locations)
+            burst_index.add(image_hash, filename, face_locations, face_encodings, time.perf_counter() - started)
+            print(f"--- [PROCESS] Found {len(face_encodings)} face(s) in {filename}")
+        
+        person_ids_in_image = {model.learn_face(encoding) for encoding in face_encodings}
+
+        if len(face_encodings) > 0:
+            for pid in person_ids_in_image:
+                person_dir = os.path.join(output_dir, pid)
+                os.makedirs(os.path.join(person_dir, "individual"), exist_ok=True)
+                os.makedirs(os.path.join(person_dir, "group"), exist_ok=True)
+
+                if len(face_encodings) == 1:
+                    # Individual photo - only save to individual folder
+                    shutil.copy(image_path, os.path.join(person_dir, "individual", filename))
+                else:
+                    # Group photo - only save to group folder
+                    shutil.copy(image_path, os.path.join(person_dir, "group", f"watermarked_{filename}"))
+
+    except Exception as e:
+        print(f"  -> ERROR processing {filename}: {e}")
+
+def finish_event_processing(event_id):
+    model.save_model() # Save any newly learned faces
+
+    burst_index = get_burst_index(event_id)
+    save_burst_index(event_id, burst_index)
+    stats = burst_index.take_stats()
+    print(f"--- [PROCESS] Burst stage: {stats['reused']}/{stats['hashed']} images reused faces, "
+          f"saved {stats['encode_seconds_saved']:.2f}s of encoding for {stats['hash_seconds']:.2f}s of hashing ---")
+    return stats
+
 def process_images(event_id):
     try:
         input_dir = os.path.join(app.config['UPLOAD_FOLDER'], event_id)
-        output_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
-        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(os.path.join(app.config['PROCESSED_FOLDER'], event_id), exist_ok=True)
         
         print(f"--- [PROCESS] Starting for event: {event_id} ---")
         for filename in os.listdir(input_dir):
             if filename.lower().endswith(('.png', '.jpg', '.jpeg')) and not filename.endswith('_qr.png'):
-                image_path = os.path.join(input_dir, filename)
-                print(f"--- [PROCESS] Image: {filename}")
-                try:
-                    image = face_recognition.load_image_file(image_path)
-                    face_encodings = face_recognition.face_encodings(image)
-                    print(f"--- [PROCESS] Found {len(face_encodings)} face(s) in {filename}")
-                    
-                    person_ids_in_image = {model.learn_face(encoding) for encoding in face_encodings}
-
-                    if len(face_encodings) > 0:
-                        for pid in person_ids_in_image:
-                            person_dir = os.path.join(output_dir, pid)
-                            os.makedirs(os.path.join(person_dir, "individual"), exist_ok=True)
-                            os.makedirs(os.path.join(person_dir, "group"), exist_ok=True)
-
-                            if len(face_encodings) == 1:
-                                # Individual photo - only save to individual folder
-                                shutil.copy(image_path, os.path.join(person_dir, "individual", filename))
-                            else:
-                                # Group photo - only save to group folder
-                                shutil.copy(image_path, os.path.join(person_dir, "group", f"watermarked_{filename}"))
-
-                except Exception as e:
-                    print(f"  -> ERROR processing {filename}: {e}")
+                process_image(event_id, filename)
         
-        model.save_model() # Save any newly learned faces
+        stats = finish_event_processing(event_id)
         print(f"--- [PROCESS] Finished for event: {event_id} ---")
+        return stats
     except Exception as e:
         print(f"  -> FATAL ERROR during processing for event {event_id}: {e}")
 
+def processing_worker():
+    """Processes single files queued by chunked uploads as soon as each one completes."""
+    pending_events = set()
+    while True:
+        event_id, filename = processing_queue.get()
+        try:
+            os.makedirs(os.path.join(app.config['PROCESSED_FOLDER'], event_id), exist_ok=True)
+            process_image(event_id, filename)
+            pending_events.add(event_id)
+            # Persist once the burst of uploads has drained rather than after every file
+            if processing_queue.empty():
+                for pending_event_id in pending_events:
+                    finish_event_processing(pending_event_id)
+                pending_events.clear()
+        except Exception as e:
+            print(f"  -> ERROR in processing worker for {event_id}/{filename}: {e}")
+        finally:
+            processing_queue.task_done()
+
+def increment_photos_count(event_id, count):
+    def increment(events_data):
+        for event in events_data:
+            if event['id'] == event_id:
+                event['photos_count'] += count
+                break
+    update_events_data(increment)
+
+@app.before_request
+def start_background_tasks():
+    ensure_retention_thread()
+
 # --- ROUTES FOR SERVING PAGES ---
 @app.route('/')
 def serve_index(): return render_template('index.html')
@@ -175,7 +366,7 @@ def get_events():
     try:
         with open(EVENTS_DATA_PATH, 'r') as f:
             events_data = json.load(f)
-        return jsonify(events_data)
+        return jsonify([event for event in events_data if not event.get('expired_at')])
     except FileNotFoundError:
         return jsonify([])  # Return empty list if file doesn't exist
     except Exception as e:
@@ -191,10 +382,7 @@ def recognize_face():
         event_id = data.get('event_id', 'default_event')
         if not image_data: return jsonify({"success": False, "error": "No image provided"}), 400
         
-        img_bytes = base64.b64decode(image_data)
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        rgb_img = decode_base64_image(image_data)
 
         face_locations = face_recognition.face_locations(rgb_img)
         if not face_locations: return jsonify({"success": False, "error": "No face detected in scan."}), 400
@@ -205,13 +393,9 @@ def recognize_face():
         person_id = model.recognize_face(scanned_encoding)
         
         if person_id:
-            person_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id, person_id)
-            if not os.path.exists(person_dir): return jsonify({"success": False, "error": "Match found, but no photos in this event."}), 404
-            
-            individual_dir = os.path.join(person_dir, "individual")
-            group_dir = os.path.join(person_dir, "group")
-            individual_photos = [f for f in os.listdir(individual_dir)] if os.path.exists(individual_dir) else []
-            group_photos = [f for f in os.listdir(group_dir) if f.startswith('watermarked_')] if os.path.exists(group_dir) else []
+            photos = get_person_photos(event_id, person_id)
+            if photos is None: return jsonify({"success": False, "error": "Match found, but no photos in this event."}), 404
+            individual_photos, group_photos = photos
             
             return jsonify({"success": True, "person_id": person_id, "individual_photos": individual_photos, "group_photos": group_photos, "event_id": event_id})
         else:
@@ -221,6 +405,56 @@ def recognize_face():
         print(f"RECOGNIZE ERROR: {e}")
         return jsonify({"success": False, "error": "An internal error occurred."}), 500
 
+# --- LIVE (STREAMING) RECOGNITION ROUTES ---
+@app.route('/recognize/stream', methods=['POST'])
+@login_required
+def open_recognition_stream():
+    expire_idle_streams()
+    stream_id = uuid.uuid4().hex
+    with recognition_streams_lock:
+        recognition_streams[stream_id] = FaceTracker(model)
+    return jsonify({"success": True, "stream_id": stream_id}), 201
+
+@app.route('/recognize/stream/<stream_id>', methods=['POST'])
+@login_required
+def recognize_stream_frame(stream_id):
+    try:
+        expire_idle_streams()
+        with recognition_streams_lock:
+            tracker = recognition_streams.get(stream_id)
+        if tracker is None: return jsonify({"success": False, "error": "Stream not found or expired."}), 404
+
+        data = request.get_json()
+        image_data = data.get('image')
+        event_id = data.get('event_id', 'default_event')
+        if not image_data: return jsonify({"success": False, "error": "No frame provided"}), 400
+
+        track = tracker.process_frame(decode_base64_image(image_data))
+        if track is None:
+            # Not confident yet: the client keeps sending frames
+            return jsonify({"success": False, "pending": True, "faces": len(tracker.tracks)})
+
+        with recognition_streams_lock:
+            recognition_streams.pop(stream_id, None)
+        print(f"--- [STREAM] {stream_id[:8]} matched {track.person_id} after {tracker.stats} ---")
+
+        photos = get_person_photos(event_id, track.person_id)
+        if photos is None: return jsonify({"success": False, "error": "Match found, but no photos in this event."}), 404
+        individual_photos, group_photos = photos
+
+        return jsonify({"success": True, "person_id": track.person_id, "individual_photos": individual_photos, "group_photos": group_photos, "event_id": event_id})
+
+    except Exception as e:
+        print(f"STREAM RECOGNIZE ERROR: {e}")
+        return jsonify({"success": False, "error": "An internal error occurred."}), 500
+
+@app.route('/recognize/stream/<stream_id>', methods=['DELETE'])
+@login_required
+def close_recognition_stream(stream_id):
+    with recognition_streams_lock:
+        recognition_streams.pop(stream_id, None)
+    return jsonify({"success": True})
+
 # --- EVENT ORGANIZER API ROUTES ---
 @app.route('/api/create_event', methods=['POST'])
 @login_required
@@ -231,9 +465,13 @@ def create_event():
         event_location = data.get('eventLocation')
         event_date = data.get('eventDate')
         event_category = data.get('eventCategory', 'General')
+        retention_days = data.get('retentionDays', DEFAULT_RETENTION_DAYS)
+        retention_action = data.get('retentionAction', 'delete')
         
         if not all([event_name, event_location, event_date]):
             return jsonify({"success": False, "error": "All fields are required"}), 400
+        if not isinstance(retention_days, int) or retention_days < 1 or retention_action not in RETENTION_ACTIONS:
+            return jsonify({"success": False, "error": "Invalid retention policy"}), 400
         
         # Generate unique event ID
         event_id = f"event_{uuid.uuid4().hex[:8]}"
@@ -255,13 +493,6 @@ def create_event():
         qr_path = os.path.join(event_upload_dir, f"{event_id}_qr.png")
         qr_img.save(qr_path)
         
-        # Load existing events data
-        if os.path.exists(EVENTS_DATA_PATH):
-            with open(EVENTS_DATA_PATH, 'r') as f:
-                events_data = json.load(f)
-        else:
-            events_data = []
-        
         # Add new event
         new_event = {
             "id": event_id,
@@ -274,14 +505,13 @@ def create_event():
             "qr_code": f"/api/qr_code/{event_id}",
             "created_by": session.get('user_id'),
             "created_at": datetime.now().isoformat(),
+            "retention_days": retention_days,
+            "retention_action": retention_action,
             "sample_photos": []
         }
         
-        events_data.append(new_event)
-        
         # Save updated events data
-        with open(EVENTS_DATA_PATH, 'w') as f:
-            json.dump(events_data, f, indent=2)
+        update_events_data(lambda events_data: events_data.append(new_event))
         
         return jsonify({"success": True, "event_id": event_id, "message": "Event created successfully!"}), 201
         
@@ -323,17 +553,7 @@ def upload_event_photos(event_id):
         threading.Thread(target=process_images, args=(event_id,)).start()
         
         # Update photo count in events data
-        if os.path.exists(EVENTS_DATA_PATH):
-            with open(EVENTS_DATA_PATH, 'r') as f:
-                events_data = json.load(f)
-            
-            for event in events_data:
-                if event['id'] == event_id:
-                    event['photos_count'] += len(uploaded_files)
-                    break
-            
-            with open(EVENTS_DATA_PATH, 'w') as f:
-                json.dump(events_data, f, indent=2)
+        increment_photos_count(event_id, len(uploaded_files))
         
         return jsonify({
             "success": True, 
@@ -345,6 +565,69 @@ def upload_event_photos(event_id):
         print(f"Error uploading photos: {e}")
         return jsonify({"success": False, "error": "Failed to upload photos"}), 500
 
+# --- RESUMABLE (CHUNKED) UPLOAD ROUTES ---
+# tus-style: POST creates an upload, HEAD reports its Upload-Offset, PATCH appends bytes at that offset
+@app.route('/api/uploads/<event_id>', methods=['POST'])
+@login_required
+def create_chunked_upload(event_id):
+    try:
+        chunked_uploads.expire_idle()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Expected a JSON object with filename and length"}), 400
+        filename = os.path.basename(str(data.get('filename') or ''))
+        length = data.get('length')
+        
+        if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], event_id)):
+            return jsonify({"success": False, "error": "Event not found"}), 404
+        if not filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+            return jsonify({"success": False, "error": "Only PNG and JPEG photos are allowed"}), 400
+        if not isinstance(length, int) or isinstance(length, bool) or length <= 0 or length > MAX_UPLOAD_SIZE:
+            return jsonify({"success": False, "error": "Invalid upload length"}), 400
+        
+        upload = chunked_uploads.create(event_id, filename, length)
+        return jsonify({"success": True, "upload_id": upload.upload_id, "offset": 0}), 201, {"Upload-Offset": "0"}
+    
+    except Exception as e:
+        print(f"Error creating chunked upload: {e}")
+        return jsonify({"success": False, "error": "Failed to create upload"}), 500
+
+@app.route('/api/uploads/<event_id>/<upload_id>', methods=['HEAD'])
+@login_required
+def get_chunked_upload_offset(event_id, upload_id):
+    upload = chunked_uploads.get(event_id, upload_id)
+    if upload is None: return "", 404
+    headers = {"Upload-Offset": str(upload.offset), "Upload-Length": str(upload.length), "Cache-Control": "no-store"}
+    if upload.result:
+        # Completed: lets a client whose final PATCH response was lost find out where its file went
+        headers.update({"Upload-Filename": quote(upload.result["filename"]), "Upload-Sha256": upload.result["sha256"],
+                        "Upload-Duplicate": str(upload.result["duplicate"]).lower()})
+    return "", 200, headers
+
+@app.route('/api/uploads/<event_id>/<upload_id>', methods=['PATCH'])
+@login_required
+def append_chunked_upload(event_id, upload_id):
+    upload = chunked_uploads.get(event_id, upload_id)
+    if upload is None: return jsonify({"success": False, "error": "Upload not found"}), 404
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"success": False, "error": "Upload-Offset header is required"}), 400
+    
+    try:
+        # request.stream reads the body as it arrives, nothing is spooled to a temp file
+        new_offset, result = chunked_uploads.write_chunk(event_id, upload, offset, request.stream)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "offset": upload.offset}), 409, {"Upload-Offset": str(upload.offset)}
+    except Exception as e:
+        print(f"Error writing upload chunk: {e}")
+        return jsonify({"success": False, "error": "Failed to write chunk", "offset": upload.offset}), 500
+    
+    response = {"success": True, "offset": new_offset, "complete": result is not None}
+    if result: response.update(result)
+    return jsonify(response), 200, {"Upload-Offset": str(new_offset)}
+
 @app.route('/api/my_events')
 @login_required
 def get_my_events():
@@ -363,6 +646,26 @@ def get_my_events():
         print(f"Error fetching events: {e}")
         return jsonify({"success": False, "error": "Failed to fetch events"}), 500
 
+# --- RETENTION API ROUTES ---
+@app.route('/api/retention/stats')
+@login_required
+def get_retention_stats():
+    if session.get('user_type') != 'organizer': return jsonify({"success": False, "error": "Organizers only"}), 403
+    return jsonify({"success": True, "stats": retention.stats, "pending_tombstones": len(model.tombstones)})
+
+@app.route('/api/retention/run', methods=['POST'])
+@login_required
+def run_retention():
+    # ?dry_run=1 reports what would be reclaimed without touching anything
+    if session.get('user_type') != 'organizer': return jsonify({"success": False, "error": "Organizers only"}), 403
+    try:
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        tick_stats = retention.tick(dry_run=dry_run)
+        return jsonify({"success": True, "dry_run": dry_run, "tick": tick_stats})
+    except Exception as e:
+        print(f"Error running retention: {e}")
+        return jsonify({"success": False, "error": "Failed to run retention"}), 500
+
 # --- EXISTING FILE SERVING ROUTES ---
 @app.route('/api/events/<event_id>/photos', methods=['GET'])
 def get_event_photos(event_id):
@@ -379,6 +682,16 @@ def get_event_photos(event_id):
                 if filename.startswith('watermarked_'):
                     unique_photos.add(filename)
     
+    # Optionally collapse burst shots into their first frame: ?group_bursts=1
+    if request.args.get('group_bursts'):
+        bursts = {}
+        for duplicate, representative in load_burst_groups(event_id).items():
+            if f"watermarked_{duplicate}" in unique_photos and f"watermarked_{representative}" in unique_photos:
+                unique_photos.discard(f"watermarked_{duplicate}")
+                bursts.setdefault(f"/photos/{event_id}/all/watermarked_{representative}", []).append(f"/photos/{event_id}/all/watermarked_{duplicate}")
+        photo_urls = [f"/photos/{event_id}/all/{filename}" for filename in sorted(list(unique_photos))]
+        return jsonify({"success": True, "photos": photo_urls, "bursts": bursts})
+
     photo_urls = [f"/photos/{event_id}/all/{filename}" for filename in sorted(list(unique_photos))]
     return jsonify({"success": True, "photos": photo_urls})
 
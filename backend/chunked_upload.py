@@ -0,0 +1,224 @@
+import os
+import json
+import hashlib
+import threading
+import time
+import uuid
+
+PART_SUFFIX = '.part'
+META_SUFFIX = '.upload.json'
+HASHES_FILENAME = '.hashes.json'
+COPY_BUFFER_SIZE = 1024 * 1024
+SWEEP_INTERVAL = 60  # Seconds between scans for idle uploads
+
+class UploadSession:
+    def __init__(self, upload_id, event_dir, filename, length, offset=0):
+        """
+        One resumable upload. Bytes are appended straight to "<filename>.part"
+        inside the event folder and renamed in place when complete, so the
+        file is never spooled or copied.
+        """
+        self.upload_id = upload_id
+        self.event_dir = event_dir
+        self.filename = filename
+        self.length = length
+        self.offset = offset
+        self.sha256 = hashlib.sha256()
+        self.lock = threading.Lock()
+        self.result = None          # Set once complete, so a client that lost the last response can still ask
+        self.needs_rehash = False   # Reloaded after a restart: the hash of the bytes on disk is rebuilt on first use
+        self.expired = False
+
+    @property
+    def part_path(self):
+        return os.path.join(self.event_dir, self.filename + PART_SUFFIX)
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.event_dir, f".{self.upload_id}{META_SUFFIX}")
+
+    def save_meta(self):
+        with open(self.meta_path, 'w') as f:
+            json.dump({"upload_id": self.upload_id, "filename": self.filename, "length": self.length,
+                       "result": self.result}, f)
+
+    def rehash_existing(self):
+        """Rebuilds the running hash from the bytes already on disk (after a server restart)."""
+        self.sha256 = hashlib.sha256()
+        self.offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        with open(self.part_path, 'ab+') as f:
+            f.seek(0)
+            while chunk := f.read(COPY_BUFFER_SIZE):
+                self.sha256.update(chunk)
+
+
+class ChunkedUploadManager:
+    """
+    tus-style resumable uploads: create() reserves a file of a known length,
+    write_chunk() appends bytes at the current offset while hashing them, and
+    the upload completes when offset == length. Finished files are de-duplicated
+    per event by sha256 and handed to on_complete(event_id, filename).
+
+    A completed upload stays answerable for completed_ttl seconds: it reports
+    offset == length and its result. Uploads with no bytes arriving for
+    idle_timeout seconds are removed by expire_idle(), .part file included.
+
+    Lock order is session.lock, then self.lock.
+    """
+    def __init__(self, upload_folder, on_complete=None, idle_timeout=24 * 60 * 60, completed_ttl=60 * 60):
+        self.upload_folder = upload_folder
+        self.on_complete = on_complete
+        self.idle_timeout = idle_timeout
+        self.completed_ttl = completed_ttl
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.last_sweep = 0
+
+    def _hashes_path(self, event_id):
+        return os.path.join(self.upload_folder, event_id, HASHES_FILENAME)
+
+    def _load_hashes(self, event_id):
+        path = self._hashes_path(event_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def create(self, event_id, filename, length):
+        event_dir = os.path.join(self.upload_folder, event_id)
+        session = UploadSession(uuid.uuid4().hex, event_dir, f"{uuid.uuid4().hex[:8]}_{filename}", length)
+        open(session.part_path, 'wb').close()
+        session.save_meta()
+        with self.lock:
+            self.sessions[(event_id, session.upload_id)] = session
+        return session
+
+    def get(self, event_id, upload_id):
+        """Returns the session, reloading it from its metadata file if the server restarted."""
+        if not upload_id.isalnum():
+            return None
+        with self.lock:
+            session = self.sessions.get((event_id, upload_id))
+            if session is None:
+                meta_path = os.path.join(self.upload_folder, event_id, f".{upload_id}{META_SUFFIX}")
+                if not os.path.exists(meta_path):
+                    return None
+                with open(meta_path, 'r') as f:
+                    meta = json.load(f)
+                session = UploadSession(upload_id, os.path.dirname(meta_path), meta['filename'], meta['length'])
+                if meta.get('result'):
+                    session.offset, session.result = session.length, meta['result']
+                else:
+                    session.needs_rehash = True
+                self.sessions[(event_id, upload_id)] = session
+
+        # Re-reading up to MAX_UPLOAD_SIZE bytes only holds up this upload, not every other one
+        with session.lock:
+            if session.needs_rehash:
+                session.rehash_existing()
+                session.needs_rehash = False
+        return session
+
+    def write_chunk(self, event_id, session, offset, stream):
+        """
+        Appends the request body at offset. Returns (new_offset, result) where
+        result is None until the upload completes, then a dict describing it.
+        Raises ValueError when the offset does not match or the chunk overruns.
+        An empty write at offset == length to a completed upload returns its result again.
+        """
+        with session.lock:
+            if session.expired:
+                raise ValueError("Upload expired")
+            if offset != session.offset:
+                raise ValueError(f"Offset mismatch: expected {session.offset}, got {offset}")
+            if session.result is not None:
+                return session.offset, session.result
+            with open(session.part_path, 'ab') as f:
+                while chunk := stream.read(COPY_BUFFER_SIZE):
+                    if session.offset + len(chunk) > session.length:
+                        f.truncate(session.offset)
+                        raise ValueError("Chunk exceeds the declared upload length")
+                    f.write(chunk)
+                    session.sha256.update(chunk)
+                    session.offset += len(chunk)
+
+            if session.offset < session.length:
+                return session.offset, None
+            return session.offset, self._finish(event_id, session)
+
+    def _finish(self, event_id, session):
+        digest = session.sha256.hexdigest()
+        with self.lock:
+            hashes = self._load_hashes(event_id)
+            if digest in hashes:
+                os.remove(session.part_path)
+                session.result = {"filename": hashes[digest], "sha256": digest, "duplicate": True}
+                session.save_meta()
+                return session.result
+            os.rename(session.part_path, os.path.join(session.event_dir, session.filename))
+            hashes[digest] = session.filename
+            with open(self._hashes_path(event_id), 'w') as f:
+                json.dump(hashes, f)
+            session.result = {"filename": session.filename, "sha256": digest, "duplicate": False}
+            session.save_meta()
+
+        if self.on_complete:
+            self.on_complete(event_id, session.filename)
+        return session.result
+
+    # --- EXPIRY ---
+    def expire_idle(self):
+        """
+        Removes incomplete uploads idle for idle_timeout and forgets completed
+        ones after completed_ttl. Works from the metadata files on disk, so
+        uploads abandoned before a restart are found too. Scans at most once
+        every SWEEP_INTERVAL seconds; returns the number of uploads removed.
+        """
+        now = time.time()
+        with self.lock:
+            if now - self.last_sweep < SWEEP_INTERVAL:
+                return 0
+            self.last_sweep = now
+
+        removed = 0
+        for event_id in os.listdir(self.upload_folder):
+            event_dir = os.path.join(self.upload_folder, event_id)
+            if not os.path.isdir(event_dir):
+                continue
+            for name in os.listdir(event_dir):
+                if not (name.startswith('.') and name.endswith(META_SUFFIX)):
+                    continue
+                key = (event_id, name[1:-len(META_SUFFIX)])
+                with self.lock:
+                    session = self.sessions.get(key)
+                    if session is None:
+                        removed += self._remove_if_idle(key, os.path.join(event_dir, name), now)
+                        continue
+                with session.lock:
+                    with self.lock:
+                        removed += self._remove_if_idle(key, session.meta_path, now)
+        return removed
+
+    def _remove_if_idle(self, key, meta_path, now):
+        """Caller holds self.lock, and the session's lock if it is loaded."""
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        part_path = os.path.join(os.path.dirname(meta_path), meta['filename'] + PART_SUFFIX)
+        if meta.get('result'):
+            last_activity, timeout = os.path.getmtime(meta_path), self.completed_ttl
+        else:
+            last_activity = max(os.path.getmtime(p) for p in (meta_path, part_path) if os.path.exists(p))
+            timeout = self.idle_timeout
+        if now - last_activity <= timeout:
+            return 0
+
+        session = self.sessions.pop(key, None)
+        if session:
+            session.expired = True
+        if not meta.get('result') and os.path.exists(part_path):
+            os.remove(part_path)
+        os.remove(meta_path)
+        return 1
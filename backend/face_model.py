@@ -2,6 +2,8 @@ import face_recognition
 import numpy as np
 import os
 import pickle
+import json
+import threading
 
 class FaceRecognitionModel:
     def __init__(self, data_file='known_faces.dat'):
@@ -11,6 +13,11 @@ class FaceRecognitionModel:
         self.data_file = data_file
         self.known_encodings = []
         self.known_ids = []
+        # Kept next to the data file so known_faces.dat keeps its (encodings, ids) format
+        self.state_file = f"{data_file}.state.json"
+        self.tombstones = set()  # IDs waiting to be dropped by the next compact()
+        self.next_person_number = 1  # Only ever counts up, so a compacted-away ID is never handed out again
+        self.lock = threading.RLock()
         self.load_model()
 
     def load_model(self):
@@ -22,21 +29,46 @@ class FaceRecognitionModel:
                 print(f"--- [ML MODEL] Loaded {len(self.known_ids)} known faces. ---")
             except Exception as e:
                 print(f"--- [ML MODEL] Error loading model data: {e}. Starting fresh. ---")
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+                self.tombstones = set(state.get('tombstones', [])) & set(self.known_ids)
+                self.next_person_number = state.get('next_person_number', 1)
+            except Exception as e:
+                print(f"--- [ML MODEL] Error loading model state: {e}. ---")
+        highest = max((int(pid.split('_')[-1]) for pid in self.known_ids), default=0)
+        self.next_person_number = max(self.next_person_number, highest + 1)
+
+    def _save_state(self):
+        with self.lock, open(self.state_file, 'w') as f:
+            json.dump({"tombstones": sorted(self.tombstones), "next_person_number": self.next_person_number}, f)
 
     def save_model(self):
         """Saves the current known faces and IDs to the data file."""
-        with open(self.data_file, 'wb') as f:
-            pickle.dump((self.known_encodings, self.known_ids), f)
+        with self.lock:
+            with open(self.data_file, 'wb') as f:
+                pickle.dump((self.known_encodings, self.known_ids), f)
+            self._save_state()
         print(f"--- [ML MODEL] Model saved with {len(self.known_ids)} faces. ---")
 
+    def _next_person_id(self):
+        new_id = f"person_{self.next_person_number:04d}"
+        self.next_person_number += 1
+        return new_id
+
     def learn_face(self, new_encoding):
         """
         Learns a new face. If the face is already known, it returns the existing ID.
         If the face is new, it assigns a new ID and returns it.
         """
+        with self.lock:
+            return self._learn_face(new_encoding)
+
+    def _learn_face(self, new_encoding):
         if not self.known_encodings:
             # This is the first face ever.
-            new_id = f"person_{len(self.known_ids) + 1:04d}"
+            new_id = self._next_person_id()
             self.known_encodings.append(new_encoding)
             self.known_ids.append(new_id)
             print(f"--- [ML MODEL] Learned first face. Assigned ID: {new_id} ---")
@@ -48,11 +80,12 @@ class FaceRecognitionModel:
 
         # A very strict tolerance to decide if this is an existing person
         if face_distances[best_match_index] < 0.5:
-            # This is an existing person
+            # This is an existing person; seeing them again cancels a pending tombstone
+            self.tombstones.discard(self.known_ids[best_match_index])
             return self.known_ids[best_match_index]
         else:
             # This is a new person
-            new_id = f"person_{len(self.known_ids) + 1:04d}"
+            new_id = self._next_person_id()
             self.known_encodings.append(new_encoding)
             self.known_ids.append(new_id)
             print(f"--- [ML MODEL] Learned a new face. Assigned ID: {new_id} ---")
@@ -63,6 +96,11 @@ class FaceRecognitionModel:
         Recognizes a face using a strict tolerance. Returns the person's ID on a
         confident match, otherwise returns None.
         """
+        # compact() swaps the stored lists; hold the lock so distances and IDs come from the same version
+        with self.lock:
+            return self._recognize_face(scanned_encoding)
+
+    def _recognize_face(self, scanned_encoding):
         if not self.known_encodings:
             return None
 
@@ -73,9 +111,35 @@ class FaceRecognitionModel:
         STRICT_TOLERANCE = 0.54
 
         if face_distances[best_match_index] <= STRICT_TOLERANCE:
+            if self.known_ids[best_match_index] in self.tombstones:
+                print(f"--- [ML MODEL] Best match {self.known_ids[best_match_index]} is tombstoned. ---")
+                return None
             person_id = self.known_ids[best_match_index]
             print(f"--- [ML MODEL] Confident match for {person_id} with distance {face_distances[best_match_index]:.2f} ---")
             return person_id
         else:
             print(f"--- [ML MODEL] No confident match. Best distance was {face_distances[best_match_index]:.2f} (Threshold: {STRICT_TOLERANCE}) ---")
             return None
+
+    def tombstone(self, person_ids):
+        """Marks identities for removal and persists the marks. They stop matching now and are dropped by compact()."""
+        with self.lock:
+            known = set(self.known_ids)
+            new = {pid for pid in person_ids if pid in known} - self.tombstones
+            self.tombstones |= new
+            if new:
+                self._save_state()
+        return len(new)
+
+    def compact(self):
+        """Removes tombstoned identities from the store. Returns the number of vectors reclaimed."""
+        with self.lock:
+            if not self.tombstones:
+                return 0
+            kept = [(e, pid) for e, pid in zip(self.known_encodings, self.known_ids) if pid not in self.tombstones]
+            reclaimed = len(self.known_ids) - len(kept)
+            self.known_encodings, self.known_ids = [e for e, _ in kept], [pid for _, pid in kept]
+            self.tombstones = set()
+            self.save_model()
+        print(f"--- [ML MODEL] Compacted store, reclaimed {reclaimed} vectors. ---")
+        return reclaimed
@@ -0,0 +1,169 @@
+import face_recognition
+import numpy as np
+import cv2
+import threading
+import time
+
+class FaceTrack:
+    def __init__(self, track_id, box):
+        """
+        A single face followed across frames. The box uses the face_recognition
+        (top, right, bottom, left) order.
+        """
+        self.track_id = track_id
+        self.box = box
+        self.encodings = []
+        self.best_quality = 0.0
+        self.person_id = None
+        self.misses = 0
+
+    def mean_encoding(self):
+        return np.mean(self.encodings, axis=0)
+
+
+class FaceTracker:
+    """
+    Follows faces across a stream of video frames so that the expensive steps
+    only run when they are worth it:
+      * detection runs on keyframes only,
+      * boxes are carried between keyframes with sparse optical flow,
+      * encoding runs only for new tracks or when a track's quality improves,
+      * recognition uses the average embedding of the whole track.
+    """
+    def __init__(self, model, keyframe_interval=3, iou_threshold=0.3, max_misses=2,
+                 quality_gain=0.1, min_samples=2):
+        self.model = model
+        self.keyframe_interval = keyframe_interval
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.quality_gain = quality_gain
+        self.min_samples = min_samples
+
+        self.tracks = []
+        self.frame_index = 0
+        self.prev_gray = None
+        self.next_track_id = 1
+        self.lock = threading.Lock()
+        self.last_seen = time.time()
+        self.stats = {"frames": 0, "detections": 0, "encodings": 0}
+
+    # --- GEOMETRY HELPERS ---
+    @staticmethod
+    def iou(a, b):
+        top, right = max(a[0], b[0]), min(a[1], b[1])
+        bottom, left = min(a[2], b[2]), max(a[3], b[3])
+        inter = max(0, right - left) * max(0, bottom - top)
+        area_a = (a[1] - a[3]) * (a[2] - a[0])
+        area_b = (b[1] - b[3]) * (b[2] - b[0])
+        union = area_a + area_b - inter
+        return inter / union if union > 0 else 0.0
+
+    @staticmethod
+    def face_quality(gray, box):
+        """Bigger and sharper faces give better encodings: box area x Laplacian variance."""
+        top, right, bottom, left = box
+        crop = gray[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)]
+        if crop.size == 0:
+            return 0.0
+        sharpness = cv2.Laplacian(crop, cv2.CV_64F).var()
+        return float(crop.shape[0] * crop.shape[1] * sharpness)
+
+    def _shift_boxes(self, gray):
+        """Moves every track box by the median optical flow of the corners inside it."""
+        height, width = gray.shape
+        for track in self.tracks:
+            top, right, bottom, left = track.box
+            mask = np.zeros_like(gray)
+            mask[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)] = 255
+            points = cv2.goodFeaturesToTrack(self.prev_gray, maxCorners=30, qualityLevel=0.01, minDistance=5, mask=mask)
+            if points is None:
+                continue
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+            good = status.reshape(-1) == 1
+            if good.sum() < 3:
+                continue
+            dx, dy = np.median((new_points - points).reshape(-1, 2)[good], axis=0)
+            dx, dy = int(round(dx)), int(round(dy))
+            track.box = (
+                min(max(top + dy, 0), height), min(max(right + dx, 0), width),
+                min(max(bottom + dy, 0), height), min(max(left + dx, 0), width),
+            )
+
+    def _match_detections(self, detections):
+        """Greedy IoU matching. Returns (matched pairs, unmatched detection indices, matched track indices)."""
+        pairs = sorted(
+            ((self.iou(track.box, box), t, d) for t, track in enumerate(self.tracks) for d, box in enumerate(detections)),
+            reverse=True,
+        )
+        used_tracks, used_detections, matches = set(), set(), []
+        for score, t, d in pairs:
+            if score < self.iou_threshold:
+                break
+            if t in used_tracks or d in used_detections:
+                continue
+            used_tracks.add(t)
+            used_detections.add(d)
+            matches.append((self.tracks[t], detections[d]))
+        unmatched = [d for d in range(len(detections)) if d not in used_detections]
+        return matches, unmatched, used_tracks
+
+    # --- MAIN ENTRY POINT ---
+    def process_frame(self, rgb_img):
+        """
+        Feeds one RGB frame into the tracker. Returns the track with the most samples
+        among those that have a confident, averaged match, otherwise None.
+        """
+        with self.lock:
+            self.last_seen = time.time()
+            self.stats["frames"] += 1
+            gray = cv2.cvtColor(rgb_img, cv2.COLOR_RGB2GRAY)
+
+            if self.prev_gray is not None and self.tracks and self.prev_gray.shape == gray.shape:
+                self._shift_boxes(gray)
+
+            is_keyframe = self.frame_index % self.keyframe_interval == 0 or not self.tracks
+            self.frame_index += 1
+            self.prev_gray = gray
+            if not is_keyframe:
+                return self._best_match()
+
+            detections = face_recognition.face_locations(rgb_img)
+            self.stats["detections"] += 1
+            matches, unmatched, used_tracks = self._match_detections(detections)
+
+            to_encode = []
+            for track, box in matches:
+                track.box = box
+                track.misses = 0
+                quality = self.face_quality(gray, box)
+                if len(track.encodings) < self.min_samples or quality > track.best_quality * (1 + self.quality_gain):
+                    track.best_quality = max(track.best_quality, quality)
+                    to_encode.append(track)
+
+            for index, track in enumerate(self.tracks):
+                if index not in used_tracks:
+                    track.misses += 1
+            self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+            for d in unmatched:
+                track = FaceTrack(self.next_track_id, detections[d])
+                self.next_track_id += 1
+                track.best_quality = self.face_quality(gray, track.box)
+                self.tracks.append(track)
+                to_encode.append(track)
+
+            if to_encode:
+                encodings = face_recognition.face_encodings(rgb_img, [t.box for t in to_encode])
+                self.stats["encodings"] += len(encodings)
+                for track, encoding in zip(to_encode, encodings):
+                    track.encodings.append(encoding)
+                    # Only re-run the search when the averaged embedding actually changed
+                    track.person_id = self.model.recognize_face(track.mean_encoding())
+
+            return self._best_match()
+
+    def _best_match(self):
+        confident = [t for t in self.tracks if t.person_id and len(t.encodings) >= self.min_samples]
+        if not confident:
+            return None
+        return max(confident, key=lambda t: len(t.encodings))
@@ -0,0 +1,141 @@
+from PIL import Image
+import numpy as np
+import pickle
+import threading
+import time
+
+def dhash(image_path, hash_size=8):
+    """
+    Difference hash of an image as a hash_size*hash_size bit int. JPEGs are
+    decoded at a reduced scale via Image.draft, so this is much cheaper than
+    the full decode needed for face detection.
+    """
+    with Image.open(image_path) as img:
+        img.draft('L', (hash_size * 16, hash_size * 16))
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """Burkhard-Keller tree over int hashes for Hamming-radius lookups."""
+    def __init__(self):
+        self.root = None  # [hash, value, {distance: child}]
+        self.size = 0
+
+    def add(self, hash_value, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [hash_value, value, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, value, {}]
+                return
+            node = child
+
+    def search(self, hash_value, radius):
+        """Returns [(distance, hash, value)] for every entry within radius, closest first."""
+        if self.root is None:
+            return []
+        results, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= radius:
+                results.append((distance, node[0], node[1]))
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(results, key=lambda r: r[0])
+
+    def items(self):
+        """Returns [(hash, value)] for every entry, parents before children so re-adding keeps the shape."""
+        if self.root is None:
+            return []
+        items, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            items.append((node[0], node[1]))
+            stack.extend(node[2].values())
+        return items
+
+class BurstIndex:
+    """
+    Per-event index of already processed photos. A near-duplicate frame (within
+    max_distance bits of an indexed photo) reuses that photo's face locations
+    and encodings instead of running detection and encoding again.
+
+    save() / load() persist the indexed entries and burst groups, so an index
+    dropped from memory or lost to a restart picks up where it left off.
+    """
+    def __init__(self, max_distance=6):
+        self.max_distance = max_distance
+        self.tree = BKTree()
+        self.groups = {}  # duplicate filename -> representative filename
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.stats = self._empty_stats()
+
+    def save(self, path):
+        with self.lock:
+            data = {"entries": self.tree.items(), "groups": dict(self.groups)}
+        with open(path, 'wb') as f:
+            pickle.dump(data, f)
+
+    @classmethod
+    def load(cls, path, max_distance=6):
+        index = cls(max_distance)
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        for hash_value, entry in data["entries"]:
+            index.tree.add(hash_value, entry)
+        index.groups = data["groups"]
+        return index
+
+    @staticmethod
+    def _empty_stats():
+        return {"hashed": 0, "reused": 0, "hash_seconds": 0.0, "encode_seconds_saved": 0.0}
+
+    def take_stats(self):
+        """Returns the stats gathered since the last call and starts counting afresh."""
+        with self.lock:
+            stats, self.stats = self.stats, self._empty_stats()
+        return stats
+
+    def hash_file(self, image_path):
+        self.last_used = time.time()
+        started = time.perf_counter()
+        hash_value = dhash(image_path)
+        with self.lock:
+            self.stats["hashed"] += 1
+            self.stats["hash_seconds"] += time.perf_counter() - started
+        return hash_value
+
+    def find(self, hash_value):
+        """Returns the closest indexed entry within max_distance, or None."""
+        with self.lock:
+            matches = self.tree.search(hash_value, self.max_distance)
+        return matches[0][2] if matches else None
+
+    def add(self, hash_value, filename, face_locations, face_encodings, encode_seconds):
+        entry = {"filename": filename, "face_locations": face_locations,
+                 "face_encodings": face_encodings, "encode_seconds": encode_seconds}
+        with self.lock:
+            self.tree.add(hash_value, entry)
+        return entry
+
+    def record_duplicate(self, filename, entry):
+        # A photo matching its own entry is just being re-processed, not a saving from burst detection
+        if filename == entry["filename"]:
+            return
+        with self.lock:
+            self.groups[filename] = entry["filename"]
+            self.stats["reused"] += 1
+            self.stats["encode_seconds_saved"] += entry["encode_seconds"]
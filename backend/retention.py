@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_RETENTION_DAYS = 30
+RETENTION_ACTIONS = ('delete', 'archive')
+
+class RetentionManager:
+    """
+    Expires events according to their retention policy, a little at a time.
+
+    Each event in events_data.json may carry:
+      * "retention_days"   -- how long after "created_at" it is kept,
+      * "retention_action" -- "delete" removes originals, "archive" moves them to
+                              the archive folder. Derived files are always deleted.
+    Events created before retention existed have no "retention_days" and are
+    never expired: nobody chose a policy for them. Event folders with no entry
+    in events_data.json are archived once their folder mtime is older than
+    DEFAULT_RETENTION_DAYS, like the old cleanup loop but keeping the originals.
+
+    Once an event is found expired, that decision and the person IDs seen in it
+    are written to state_path, so a half-deleted event keeps expiring across
+    ticks and restarts even though deleting its files changes the folder mtime.
+
+    A tick touches at most max_files_per_tick files / max_bytes_per_tick bytes.
+    When an event is fully gone, identities that were only seen in it are
+    tombstoned in the model, and the store is compacted every compact_every_ticks.
+    """
+    def __init__(self, model, upload_folder, processed_folder, archive_folder, events_data_path, state_path,
+                 max_files_per_tick=200, max_bytes_per_tick=256 * 1024 * 1024, compact_every_ticks=10,
+                 update_events_data=None, on_event_expired=None):
+        self.model = model
+        self.upload_folder = upload_folder
+        self.processed_folder = processed_folder
+        self.archive_folder = archive_folder
+        self.events_data_path = events_data_path
+        self.state_path = state_path
+        self.max_files_per_tick = max_files_per_tick
+        self.max_bytes_per_tick = max_bytes_per_tick
+        self.compact_every_ticks = compact_every_ticks
+        # Callable applying a mutation to events_data.json under the app's lock; defaults to an unlocked rewrite
+        self.update_events_data = update_events_data or self._update_events_data
+        self.on_event_expired = on_event_expired
+
+        self.lock = threading.Lock()
+        self.ticks = 0
+        self.expiring = self._load_state()  # event_id -> {"action", "person_ids"}, collected before its files go
+        self.stats = {"ticks": 0, "events_expired": 0, "files_deleted": 0, "files_archived": 0,
+                      "bytes_reclaimed": 0, "bytes_archived": 0, "vectors_tombstoned": 0, "vectors_reclaimed": 0}
+
+    # --- STATE ---
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        with open(self.state_path, 'w') as f:
+            json.dump(self.expiring, f, indent=2)
+
+    # --- POLICY ---
+    def _load_events(self):
+        if not os.path.exists(self.events_data_path):
+            return []
+        with open(self.events_data_path, 'r') as f:
+            return json.load(f)
+
+    def expired_events(self, now=None):
+        """Returns [(event_id, action)] for every event past its retention period."""
+        now = now or datetime.now()
+        events = {e['id']: e for e in self._load_events()}
+        # Events already being expired stay expired, whatever their folders look like now
+        expired = [(event_id, state['action']) for event_id, state in self.expiring.items()]
+        for event_id, event in events.items():
+            if event.get('expired_at') or event_id in self.expiring:
+                continue
+            # Legacy events without a policy are kept until an organizer gives them one
+            if event.get('retention_days') is None or not event.get('created_at'):
+                continue
+            if datetime.fromisoformat(event['created_at']) + timedelta(days=event['retention_days']) < now:
+                action = event.get('retention_action')
+                expired.append((event_id, action if action in RETENTION_ACTIONS else 'archive'))
+
+        # Folders without an events_data entry fall back to folder mtime, archiving rather than deleting
+        threshold = now - timedelta(days=DEFAULT_RETENTION_DAYS)
+        for folder in (self.upload_folder, self.processed_folder):
+            if not os.path.exists(folder):
+                continue
+            for event_id in os.listdir(folder):
+                event_path = os.path.join(folder, event_id)
+                if event_id in events or not os.path.isdir(event_path) or any(e == event_id for e, _ in expired):
+                    continue
+                if datetime.fromtimestamp(os.path.getmtime(event_path)) < threshold:
+                    expired.append((event_id, 'archive'))
+        return expired
+
+    # --- IDENTITIES ---
+    def _person_ids_in_event(self, event_id):
+        event_dir = os.path.join(self.processed_folder, event_id)
+        if not os.path.isdir(event_dir):
+            return set()
+        return {p for p in os.listdir(event_dir) if os.path.isdir(os.path.join(event_dir, p))}
+
+    def _orphaned_person_ids(self, event_id, person_ids, expiring_ids):
+        """Person IDs from this event that have no sightings in any event that is being kept."""
+        kept_events = [e for e in os.listdir(self.processed_folder)
+                       if e != event_id and e not in expiring_ids and os.path.isdir(os.path.join(self.processed_folder, e))]
+        return {pid for pid in person_ids
+                if not any(os.path.isdir(os.path.join(self.processed_folder, e, pid)) for e in kept_events)}
+
+    # --- FILE WORK ---
+    def _event_files(self, event_id):
+        """Yields (kind, path) for every file of the event: originals first, then derived."""
+        for kind, folder in (('original', self.upload_folder), ('derived', self.processed_folder)):
+            event_dir = os.path.join(folder, event_id)
+            for root, _, files in os.walk(event_dir):
+                for filename in files:
+                    yield kind, os.path.join(root, filename)
+
+    def _remove_empty_dirs(self, event_id):
+        for folder in (self.upload_folder, self.processed_folder):
+            event_dir = os.path.join(folder, event_id)
+            if not os.path.isdir(event_dir):
+                continue
+            for root, _, _ in sorted(os.walk(event_dir), key=lambda w: len(w[0]), reverse=True):
+                if not os.listdir(root):
+                    os.rmdir(root)
+
+    def _update_events_data(self, mutate):
+        events = self._load_events()
+        mutate(events)
+        with open(self.events_data_path, 'w') as f:
+            json.dump(events, f, indent=2)
+
+    def _mark_event_expired(self, event_id):
+        def mark(events):
+            for event in events:
+                if event['id'] == event_id:
+                    event['expired_at'] = datetime.now().isoformat()
+                    event['photos_count'] = 0
+        self.update_events_data(mark)
+
+    # --- MAIN ENTRY POINT ---
+    def tick(self, dry_run=False):
+        """
+        Runs one bounded unit of retention work. With dry_run nothing is touched:
+        every expired event is walked in full and the returned stats say what a
+        real run would reclaim.
+        """
+        with self.lock:
+            tick_stats = {"events_expired": 0, "files_deleted": 0, "files_archived": 0,
+                          "bytes_reclaimed": 0, "bytes_archived": 0, "vectors_tombstoned": 0, "vectors_reclaimed": 0}
+            files_budget, bytes_budget = self.max_files_per_tick, self.max_bytes_per_tick
+            expired = self.expired_events()
+            expiring_ids = {event_id for event_id, _ in expired}
+
+            for event_id, action in expired:
+                if event_id in self.expiring:
+                    person_ids = set(self.expiring[event_id]['person_ids'])
+                else:
+                    person_ids = self._person_ids_in_event(event_id)
+                    if not dry_run:
+                        self.expiring[event_id] = {"action": action, "person_ids": sorted(person_ids)}
+                        self._save_state()
+
+                finished = True
+                for kind, path in self._event_files(event_id):
+                    if not dry_run and (files_budget <= 0 or bytes_budget <= 0):
+                        finished = False
+                        break
+                    size = os.path.getsize(path)
+                    files_budget -= 1
+                    bytes_budget -= size
+                    if kind == 'original' and action == 'archive':
+                        tick_stats["files_archived"] += 1
+                        tick_stats["bytes_archived"] += size
+                        if not dry_run:
+                            target = os.path.join(self.archive_folder, os.path.relpath(path, self.upload_folder))
+                            os.makedirs(os.path.dirname(target), exist_ok=True)
+                            shutil.move(path, target)
+                    else:
+                        tick_stats["files_deleted"] += 1
+                        tick_stats["bytes_reclaimed"] += size
+                        if not dry_run:
+                            os.remove(path)
+
+                if not finished:
+                    break
+
+                orphans = self._orphaned_person_ids(event_id, person_ids, expiring_ids)
+                tick_stats["events_expired"] += 1
+                if dry_run:
+                    tick_stats["vectors_tombstoned"] += len(orphans & (set(self.model.known_ids) - self.model.tombstones))
+                    continue
+
+                # Tombstones are persisted first, so a restart from here on cannot lose them
+                tick_stats["vectors_tombstoned"] += self.model.tombstone(orphans)
+                self._remove_empty_dirs(event_id)
+                self._mark_event_expired(event_id)
+                del self.expiring[event_id]
+                self._save_state()
+                if self.on_event_expired:
+                    self.on_event_expired(event_id)
+                print(f"--- [RETENTION] Expired {event_id} ({action}), tombstoned {len(orphans)} identities ---")
+
+            if not dry_run:
+                self.ticks += 1
+                if self.model.tombstones and self.ticks % self.compact_every_ticks == 0:
+                    tick_stats["vectors_reclaimed"] += self.model.compact()
+                self.stats["ticks"] += 1
+                for key, value in tick_stats.items():
+                    self.stats[key] += value
+            return tick_stats
+
+    def run_forever(self, interval_seconds=60):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"--- [RETENTION] Error during tick: {e} ---")
+            time.sleep(interval_seconds)
@@ -0,0 +1,287 @@
+"""
+Reproducible performance benchmarks for the PicMe backend.
+
+Runs without dlib: face_recognition is replaced by benchmarks.stub_face_recognition,
+which serves cached synthetic encodings. Run from the repository root:
+
+    python -m benchmarks.run                                # print results
+    python -m benchmarks.run --output results.json          # save results
+    python -m benchmarks.run --save-baseline                # record benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Each sample calls the benchmarked function as many times as it takes to run
+for at least --min-sample-ms, and times are reported per call, so even a
+3ms call is measured over hundreds of milliseconds.
+
+With --baseline the exit code is 1 when any benchmark's best-of-repeat time is
+more than its tolerance slower than the baseline (see TOLERANCES and
+--benchmark-tolerance), or when a benchmark in the baseline did not run.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import stub_face_recognition, synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'backend')
+DEFAULT_BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baseline.json')
+
+# Allowed slowdown per benchmark where the default --tolerance is too tight for its run-to-run noise
+TOLERANCES = {
+    "app.process_images": 0.5,  # JPEG decodes and file copies into processed/: still catches a 2x slowdown
+    "model.save_model": 0.3,    # pickle + file write
+    "model.load_model": 0.3,    # file read + unpickle
+}
+
+def timed(fn, repeat, min_sample_s, setup=None):
+    """
+    Times fn like timeit's autorange: the number of calls per sample doubles
+    until a sample takes at least min_sample_s, then repeat samples are taken.
+    setup, if given, runs untimed before every call so each call does the same work.
+    Returns (timing dict with per-call times, last return value).
+    """
+    def sample(loops):
+        elapsed, result = 0.0, None
+        for _ in range(loops):
+            if setup: setup()
+            started = time.perf_counter()
+            result = fn()
+            elapsed += time.perf_counter() - started
+        return elapsed, result
+
+    loops = 1
+    while sample(loops)[0] < min_sample_s:
+        loops *= 2
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        elapsed, result = sample(loops)
+        durations.append(elapsed / loops)
+    return {"median_s": statistics.median(durations), "min_s": min(durations), "repeat": repeat, "loops": loops}, result
+
+def quiet(fn):
+    """The backend logs every step with print(); keep benchmark output readable."""
+    def wrapper(*args, **kwargs):
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return wrapper
+
+# --- MODEL BENCHMARKS ---
+def bench_model(args, work_dir):
+    from face_model import FaceRecognitionModel
+    import face_utils
+
+    _, samples, _ = synthetic.identity_clusters(args.identities, 2, noise=args.noise, seed=args.seed)
+    learn_samples, query_samples = samples[0::2], samples[1::2]
+    data_file = os.path.join(work_dir, 'known_faces.dat')
+    sample_s = args.min_sample_ms / 1000.0
+    results = {}
+
+    def learn():
+        if os.path.exists(data_file): os.remove(data_file)
+        model = FaceRecognitionModel(data_file=data_file)
+        for encoding in learn_samples:
+            model.learn_face(encoding)
+        return model
+    results["model.learn_face"], model = timed(quiet(learn), args.repeat, sample_s)
+    results["model.learn_face"]["identities_learned"] = len(model.known_ids)
+
+    def recognize():
+        return sum(1 for encoding in query_samples if model.recognize_face(encoding))
+    results["model.recognize_face"], matched = timed(quiet(recognize), args.repeat, sample_s)
+    results["model.recognize_face"]["match_rate"] = matched / len(query_samples)
+
+    def search():
+        for encoding in query_samples:
+            face_utils.compare_faces(model.known_encodings, encoding)
+    results["face_utils.compare_faces"], _ = timed(search, args.repeat, sample_s)
+
+    results["model.save_model"], _ = timed(quiet(model.save_model), args.repeat, sample_s)
+    results["model.load_model"], _ = timed(quiet(model.load_model), args.repeat, sample_s)
+    results["model.load_model"]["bytes"] = os.path.getsize(data_file)
+    return results
+
+# --- END-TO-END BENCHMARKS ---
+def bench_events(args, work_dir):
+    """
+    Processes synthetic events through app.process_images, then lists their galleries.
+
+    The timed (baseline-compared) runs use a zero simulated encode cost, so they
+    measure the backend's own Python path. One extra run with encode_cost_ms
+    reports how much encode time the burst stage saves.
+    """
+    upload_folder = os.path.join(work_dir, 'uploads')
+    processed_folder = os.path.join(work_dir, 'processed')
+    # app reads its storage paths at import time: keep it out of the repo's folders and known_faces.dat
+    os.environ.update({
+        'PICME_UPLOAD_FOLDER': upload_folder,
+        'PICME_PROCESSED_FOLDER': processed_folder,
+        'PICME_ARCHIVE_FOLDER': os.path.join(work_dir, 'archive'),
+        'PICME_EVENTS_DATA_PATH': os.path.join(work_dir, 'events_data.json'),
+        'PICME_KNOWN_FACES_DATA_PATH': os.path.join(work_dir, 'app_known_faces.dat'),
+        'PICME_RETENTION_STATE_PATH': os.path.join(work_dir, 'retention_state.json'),
+        'PICME_RETENTION_ENABLED': '0',
+    })
+    try:
+        import app as app_module
+        from face_model import FaceRecognitionModel
+    except ImportError as e:
+        reason = f"backend app could not be imported: {e}"
+        return {name: {"skipped": reason} for name in ("app.process_images", "app.process_images.burst_savings", "app.get_event_photos")}
+
+    sample_s = args.min_sample_ms / 1000.0
+    encodings = {}
+    event_ids = [f"event_bench_{i:02d}" for i in range(args.events)]
+    for i, event_id in enumerate(event_ids):
+        encodings.update(synthetic.generate_event(
+            os.path.join(upload_folder, event_id), args.photos, n_attendees=args.attendees,
+            max_group_size=args.group_size, burst_fraction=args.burst_fraction, burst_length=args.burst_length,
+            noise=args.noise, seed=args.seed + i))
+
+    model_file = os.path.join(work_dir, 'app_known_faces.dat')
+    def reset():
+        # Every run starts from nothing: no processed folders, burst indexes or learned faces
+        shutil.rmtree(processed_folder, ignore_errors=True)
+        app_module.burst_indexes.clear()
+        if os.path.exists(model_file): os.remove(model_file)
+        app_module.model = quiet(FaceRecognitionModel)(data_file=model_file)
+
+    def process_all():
+        return [app_module.process_images(event_id) for event_id in event_ids]
+
+    stub_face_recognition.install(encodings, 0.0)
+    processing, _ = timed(quiet(process_all), args.repeat, sample_s, setup=reset)
+    photos = args.events * args.photos
+    processing.update({"photos": photos, "photos_per_s": photos / processing["median_s"]})
+
+    # Not baseline-compared (no median_s): the wall time is dominated by the simulated encode sleep
+    stub_face_recognition.install(encodings, args.encode_cost_ms)
+    reset()
+    started = time.perf_counter()
+    burst_stats = quiet(process_all)()
+    burst_savings = {
+        "wall_s": time.perf_counter() - started,
+        "encode_cost_ms": args.encode_cost_ms,
+        "reused": sum(s["reused"] for s in burst_stats),
+        "encode_seconds_saved": sum(s["encode_seconds_saved"] for s in burst_stats),
+        "hash_seconds": sum(s["hash_seconds"] for s in burst_stats),
+    }
+
+    client = app_module.app.test_client()
+    def list_galleries():
+        for event_id in event_ids:
+            client.get(f'/api/events/{event_id}/photos')
+            client.get(f'/api/events/{event_id}/photos?group_bursts=1')
+    listing, _ = timed(list_galleries, args.repeat, sample_s)
+    return {"app.process_images": processing, "app.process_images.burst_savings": burst_savings, "app.get_event_photos": listing}
+
+# --- BASELINE COMPARISON ---
+def compare(results, baseline, tolerances):
+    """
+    Returns (regressions, missing): [(name, baseline min, current min, ratio)] for
+    benchmarks slower than their tolerance allows, and [(name, reason)] for
+    baseline benchmarks that were skipped or absent in this run.
+    Best-of-repeat times are compared: they are far less sensitive to a noisy machine than medians.
+    """
+    regressions, missing = [], []
+    for name, previous in baseline.get("results", {}).items():
+        if "min_s" not in previous:
+            continue
+        current = results["results"].get(name, {})
+        if "min_s" not in current:
+            missing.append((name, current.get("skipped", "not run")))
+            continue
+        ratio = current["min_s"] / previous["min_s"] if previous["min_s"] else float('inf')
+        tolerance = tolerances.get(name, tolerances["default"])
+        print(f"  {name:<28} {previous['min_s'] * 1000:>10.3f}ms -> {current['min_s'] * 1000:>10.3f}ms  x{ratio:.2f} (limit x{1 + tolerance:.2f})")
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous["min_s"], current["min_s"], ratio))
+    return regressions, missing
+
+def parse_tolerances(args):
+    tolerances = dict(TOLERANCES, default=args.tolerance)
+    for override in args.benchmark_tolerance:
+        name, _, value = override.partition('=')
+        tolerances[name] = float(value)
+    return tolerances
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--identities', type=int, default=1000, help='identity clusters for the model benchmarks')
+    parser.add_argument('--noise', type=float, default=0.25, help='typical distance of a sample from its identity center')
+    parser.add_argument('--events', type=int, default=2)
+    parser.add_argument('--photos', type=int, default=100, help='photos per event, burst frames included')
+    parser.add_argument('--attendees', type=int, default=50, help='distinct people per event')
+    parser.add_argument('--group-size', type=int, default=6, help='largest number of faces in one photo')
+    parser.add_argument('--burst-fraction', type=float, default=0.3, help='share of shots taken as bursts')
+    parser.add_argument('--burst-length', type=int, default=4)
+    parser.add_argument('--encode-cost-ms', type=float, default=20.0, help='simulated encode time per face, used only for the burst-savings run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-sample-ms', type=float, default=500.0, help='shortest timed sample; fast calls are looped to reach it')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown vs baseline (0.2 = 20%%)')
+    parser.add_argument('--benchmark-tolerance', action='append', default=[], metavar='NAME=TOLERANCE',
+                        help='override the tolerance of one benchmark, e.g. app.process_images=0.5 (repeatable)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'also write results to {DEFAULT_BASELINE_PATH}')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    stub_face_recognition.install({}, args.encode_cost_ms)
+    sys.path.insert(0, BACKEND_DIR)
+
+    work_dir = tempfile.mkdtemp(prefix='picme_bench_')
+    try:
+        results = {}
+        results.update(bench_model(args, work_dir))
+        results.update(bench_events(args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = {
+        "meta": {
+            "params": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'save_baseline', 'tolerance', 'benchmark_tolerance')},
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        "results": results,
+    }
+    print(json.dumps(output, indent=2))
+    for path in filter(None, [args.output, DEFAULT_BASELINE_PATH if args.save_baseline else None]):
+        with open(path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != output["meta"]["params"]:
+            print("--- [BENCH] Warning: baseline was recorded with different parameters ---")
+        print(f"--- [BENCH] Comparing against {args.baseline} ---")
+        regressions, missing = compare(output, baseline, parse_tolerances(args))
+        for name, _, _, ratio in regressions:
+            print(f"--- [BENCH] REGRESSION {name}: x{ratio:.2f} slower than baseline ---")
+        for name, reason in missing:
+            print(f"--- [BENCH] MISSING {name}: in the baseline but not measured ({reason}) ---")
+        return 1 if regressions or missing else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
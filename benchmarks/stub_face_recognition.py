@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import types
+import numpy as np
+
+class StubImage:
+    def __init__(self, key):
+        self.key = key
+
+def install(encodings_by_filename, encode_cost_ms=20.0):
+    """
+    Installs a stand-in 'face_recognition' module so the backend runs without dlib.
+
+    Images are looked up by file name in encodings_by_filename and their cached
+    vectors are returned instead of running detection. face_encodings sleeps
+    encode_cost_ms per face so savings from skipped encodes stay visible.
+    Returns the module; call again to swap the encodings it serves.
+    """
+    module = sys.modules.get('face_recognition')
+    if not getattr(module, 'IS_BENCHMARK_STUB', False):
+        module = types.ModuleType('face_recognition')
+        module.IS_BENCHMARK_STUB = True
+        sys.modules['face_recognition'] = module
+
+    def load_image_file(path, mode='RGB'):
+        return StubImage(os.path.basename(path))
+
+    def face_locations(image, number_of_times_to_upsample=1, model='hog'):
+        return [(0, 1, 1, 0)] * len(module.encodings.get(image.key, []))
+
+    def face_encodings(image, known_face_locations=None, num_jitters=1, model='small'):
+        vectors = list(module.encodings.get(image.key, []))
+        if known_face_locations is not None:
+            vectors = vectors[:len(known_face_locations)]
+        time.sleep(module.encode_cost_ms * len(vectors) / 1000.0)
+        return vectors
+
+    def face_distance(face_encodings, face_to_compare):
+        if len(face_encodings) == 0:
+            return np.empty(0)
+        return np.linalg.norm(np.asarray(face_encodings) - face_to_compare, axis=1)
+
+    def compare_faces(known_face_encodings, face_encoding_to_check, tolerance=0.6):
+        return list(face_distance(known_face_encodings, face_encoding_to_check) <= tolerance)
+
+    module.encodings = encodings_by_filename
+    module.encode_cost_ms = encode_cost_ms
+    module.load_image_file = load_image_file
+    module.face_locations = face_locations
+    module.face_encodings = face_encodings
+    module.face_distance = face_distance
+    module.compare_faces = compare_faces
+    return module
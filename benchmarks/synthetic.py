@@ -0,0 +1,69 @@
+import os
+import pickle
+import numpy as np
+from PIL import Image
+
+ENCODING_SIZE = 128
+ENCODINGS_FILENAME = 'encodings.pkl'
+
+def identity_clusters(n_identities, samples_per_identity, noise=0.25, spread=1.0, seed=0):
+    """
+    Random 128-d identity clusters shaped like dlib encodings.
+
+    spread is the typical distance between two identity centers and noise the
+    typical distance of a sample from its center, so with the defaults samples
+    of one person fall well inside learn_face's 0.5 tolerance and different
+    people fall well outside it.
+    Returns (centers, samples, labels).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, spread / np.sqrt(2 * ENCODING_SIZE), (n_identities, ENCODING_SIZE))
+    labels = np.repeat(np.arange(n_identities), samples_per_identity)
+    samples = centers[labels] + rng.normal(0, noise / np.sqrt(ENCODING_SIZE), (len(labels), ENCODING_SIZE))
+    return centers, samples, labels
+
+def _scene(rng, width, height):
+    """A smooth random image: low-res noise upscaled, so its dHash is stable under small noise."""
+    small = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return np.asarray(Image.fromarray(small).resize((width, height), Image.BICUBIC), dtype=np.int16)
+
+def generate_event(event_dir, n_photos, n_attendees=50, max_group_size=6, burst_fraction=0.3, burst_length=4,
+                   noise=0.25, image_size=(320, 240), seed=0):
+    """
+    Writes a synthetic event upload folder and the face encodings of every photo.
+
+    Each photo shows 1..max_group_size attendees. A burst_fraction of photos
+    are followed by burst_length - 1 near-identical frames with the same faces,
+    like an event photographer's burst shots. Photo count includes burst frames.
+    The encodings are saved to event_dir/encodings.pkl as {filename: array(k, 128)}
+    and also returned.
+    """
+    rng = np.random.default_rng(seed)
+    centers, _, _ = identity_clusters(n_attendees, 0, noise=noise, seed=seed)
+    os.makedirs(event_dir, exist_ok=True)
+    width, height = image_size
+
+    encodings = {}
+    index = 0
+    while index < n_photos:
+        group_size = int(rng.integers(1, max_group_size + 1))
+        people = rng.choice(n_attendees, size=min(group_size, n_attendees), replace=False)
+        faces = centers[people] + rng.normal(0, noise / np.sqrt(ENCODING_SIZE), (len(people), ENCODING_SIZE))
+        scene = _scene(rng, width, height)
+
+        frames = burst_length if rng.random() < burst_fraction else 1
+        for _ in range(min(frames, n_photos - index)):
+            jitter = rng.integers(-3, 4, scene.shape)
+            frame = np.clip(scene + jitter, 0, 255).astype(np.uint8)
+            filename = f"photo_{index:05d}.jpg"
+            Image.fromarray(frame).save(os.path.join(event_dir, filename), quality=90)
+            encodings[filename] = faces
+            index += 1
+
+    with open(os.path.join(event_dir, ENCODINGS_FILENAME), 'wb') as f:
+        pickle.dump(encodings, f)
+    return encodings
+
+def load_event_encodings(event_dir):
+    with open(os.path.join(event_dir, ENCODINGS_FILENAME), 'rb') as f:
+        return pickle.load(f)